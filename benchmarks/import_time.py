@@ -0,0 +1,103 @@
+"""
+Import-time benchmark for the package.
+
+Imports each target in a fresh interpreter with `python -X importtime`, and
+reports the median cumulative import time, along with any optional
+dependencies the import pulled in. The core middleware and the memory backend
+should only ever depend on Starlette.
+
+Run it from the repository root:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --runs 20 --max-ms 150
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# Modules each target is allowed to import, out of the package's optional dependencies
+TARGETS: Dict[str, Set[str]] = {
+    'idempotency_header_middleware': set(),
+    'idempotency_header_middleware.backends': set(),
+    'idempotency_header_middleware.backends.memory': set(),
+    'idempotency_header_middleware.backends.redis': {'redis'},
+    'idempotency_header_middleware.backends.tiered': set(),
+}
+OPTIONAL_DEPENDENCIES = ('fastapi', 'redis', 'pydantic')
+
+
+@dataclass
+class ImportTimeResult:
+    target: str
+    timings: List[float]
+    unexpected_imports: Set[str]
+
+    @property
+    def median_ms(self) -> float:
+        return statistics.median(self.timings) / 1000
+
+    def report(self) -> str:
+        line = f'{self.target:<50} {self.median_ms:8.2f} ms'
+        if self.unexpected_imports:
+            line += '  unexpected imports: ' + ', '.join(sorted(self.unexpected_imports))
+        return line
+
+
+def measure_import(target: str) -> Tuple[float, Set[str]]:
+    """
+    Import `target` in a fresh interpreter.
+
+    Returns the cumulative import time in microseconds, and the names of all modules imported.
+    """
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+
+    cumulative = 0.0
+    modules = set()
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        if not cumulative_us.strip().isdigit():
+            continue  # header line
+        modules.add(name.strip())
+        if name.strip() == target:
+            cumulative = float(cumulative_us)
+    return cumulative, modules
+
+
+def benchmark(target: str, runs: int = 10) -> ImportTimeResult:
+    timings = []
+    unexpected: Set[str] = set()
+    for _ in range(runs):
+        cumulative, modules = measure_import(target)
+        timings.append(cumulative)
+        packages = {module.split('.')[0] for module in modules}
+        unexpected |= (packages & set(OPTIONAL_DEPENDENCIES)) - TARGETS[target]
+    return ImportTimeResult(target=target, timings=timings, unexpected_imports=unexpected)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='Number of fresh interpreters to import each target in.')
+    parser.add_argument('--max-ms', type=float, help='Fail if any median import time exceeds this many milliseconds.')
+    args = parser.parse_args(argv)
+
+    failed = False
+    for target in TARGETS:
+        result = benchmark(target, runs=args.runs)
+        sys.stdout.write(result.report() + '\n')
+        if result.unexpected_imports or (args.max_ms is not None and result.median_ms > args.max_ms):
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""
+Local load test for the idempotency middleware.
+
+Fires a configurable number of requests at an `IdempotencyHeaderMiddleware`-wrapped
+ASGI app, with a share of them reusing idempotency keys, and optionally injects
+latency and errors into the backend. The app is called directly, so no server
+or network is involved.
+
+The run verifies that the wrapped handler never executes more than once per
+idempotency key, and reports throughput and latency percentiles.
+
+Run it from the repository root:
+
+    python -m benchmarks.load_test --requests 5000 --concurrency 200 --duplicate-ratio 0.8 --handler-latency 0.01
+    python -m benchmarks.load_test --backend redis --backend-latency 0.005 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+from uuid import UUID
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse, Response
+from starlette.types import Message, Receive, Scope, Send
+
+from idempotency_header_middleware.backends.base import Backend
+from idempotency_header_middleware.backends.memory import MemoryBackend
+from idempotency_header_middleware.middleware import IdempotencyHeaderMiddleware
+
+
+class InjectedBackendError(ConnectionError):
+    """
+    Raised by the fault-injecting backend to simulate a failing backend.
+    """
+
+
+@dataclass
+class FaultInjectingBackend(Backend):
+    """
+    Backend wrapper that delays and randomly fails calls to the wrapped backend.
+    """
+
+    backend: Backend
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rng: random.Random = field(default_factory=random.Random)
+    injected_errors: int = 0
+
+    async def _inject(self) -> None:
+        if delay := self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0):
+            await asyncio.sleep(delay)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.injected_errors += 1
+            raise InjectedBackendError('Injected backend fault')
+
+    async def get_stored_response(self, idempotency_key: str) -> Optional[Response]:
+        await self._inject()
+        return await self.backend.get_stored_response(idempotency_key)
+
+    async def store_response_data(self, idempotency_key: str, payload: dict, status_code: int) -> None:
+        await self._inject()
+        await self.backend.store_response_data(idempotency_key, payload, status_code)
+
+    async def store_idempotency_key(self, idempotency_key: str) -> bool:
+        await self._inject()
+        return await self.backend.store_idempotency_key(idempotency_key)
+
+    async def clear_idempotency_key(self, idempotency_key: str) -> None:
+        await self._inject()
+        await self.backend.clear_idempotency_key(idempotency_key)
+
+
+@dataclass
+class CountingApp:
+    """
+    ASGI app that records how many times it has executed for each idempotency key.
+    """
+
+    handler_latency: float = 0.0
+    executions: Counter = field(default_factory=Counter)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        idempotency_key = Headers(scope=scope)['idempotency-key']
+        self.executions[idempotency_key] += 1
+        if self.handler_latency:
+            await asyncio.sleep(self.handler_latency)
+        await JSONResponse({'idempotency_key': idempotency_key}, 201)(scope, receive, send)
+
+
+@dataclass
+class LoadTestResult:
+    keys: List[str]
+    executions: Counter
+    latencies: List[float] = field(default_factory=list)
+    status_codes: Counter = field(default_factory=Counter)
+    replays: int = 0
+    exceptions: Counter = field(default_factory=Counter)
+    injected_errors: int = 0
+    injected_failures: Counter = field(default_factory=Counter)
+    duration: float = 0.0
+
+    @property
+    def requests(self) -> int:
+        return len(self.keys)
+
+    @property
+    def unique_keys(self) -> int:
+        return len(set(self.keys))
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.duration if self.duration else 0.0
+
+    @property
+    def duplicate_executions(self) -> Dict[str, int]:
+        """
+        Return idempotency keys the handler executed for more than once.
+        """
+        return {key: count for key, count in self.executions.items() if count > 1}
+
+    @property
+    def missing_executions(self) -> List[str]:
+        """
+        Return idempotency keys the handler never executed for.
+
+        Keys whose requests all failed with an injected backend error are excluded,
+        since those never had a chance to execute.
+        """
+        requests_per_key = Counter(self.keys)
+        return [
+            key
+            for key, count in requests_per_key.items()
+            if key not in self.executions and self.injected_failures[key] < count
+        ]
+
+    @property
+    def unexpected_exceptions(self) -> Dict[str, int]:
+        """
+        Return exceptions raised by the middleware, other than injected backend errors.
+        """
+        return {name: count for name, count in self.exceptions.items() if name != InjectedBackendError.__name__}
+
+    @property
+    def ok(self) -> bool:
+        return not (self.duplicate_executions or self.missing_executions or self.unexpected_exceptions)
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+    def report(self) -> str:
+        lines = [
+            f'requests:        {self.requests} ({self.unique_keys} unique keys)',
+            f'duration:        {self.duration:.3f}s',
+            f'throughput:      {self.throughput:.1f} req/s',
+            'latency (ms):    '
+            + '  '.join(
+                f'{name}={self.percentile(percent) * 1000:.2f}'
+                for name, percent in (('p50', 50), ('p90', 90), ('p99', 99), ('p99.9', 99.9), ('max', 100))
+            ),
+            'status codes:    ' + ', '.join(f'{code}={count}' for code, count in sorted(self.status_codes.items())),
+            f'replayed:        {self.replays}',
+            f'injected errors: {self.injected_errors}',
+        ]
+        if self.exceptions:
+            lines.append('exceptions:      ' + ', '.join(f'{name}={count}' for name, count in self.exceptions.items()))
+        lines.append(f'duplicate executions: {len(self.duplicate_executions)}')
+        lines.append(f'missing executions:   {len(self.missing_executions)}')
+        lines.append('result:          ' + ('OK' if self.ok else 'FAILED'))
+        return '\n'.join(lines)
+
+
+def build_keys(requests: int, duplicate_ratio: float, shuffle: bool, rng: random.Random) -> List[str]:
+    """
+    Build the idempotency key for each request.
+
+    `duplicate_ratio` is the share of requests reusing an already-used key. Unless
+    `shuffle` is set, requests for the same key are kept together so they arrive as
+    a concurrent storm, rather than being spread out over the run.
+    """
+    if not 0 <= duplicate_ratio < 1:
+        raise ValueError('duplicate_ratio must be in the range [0, 1)')
+
+    unique_count = max(1, round(requests * (1 - duplicate_ratio)))
+    unique_keys = [str(UUID(int=rng.getrandbits(128), version=4)) for _ in range(unique_count)]
+    counts = Counter(unique_keys)
+    for _ in range(requests - len(unique_keys)):
+        counts[rng.choice(unique_keys)] += 1
+
+    keys = [key for key in unique_keys for _ in range(counts[key])]
+    if shuffle:
+        rng.shuffle(keys)
+    return keys
+
+
+async def _send_request(app: IdempotencyHeaderMiddleware, idempotency_key: str, result: LoadTestResult) -> None:
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'POST',
+        'scheme': 'http',
+        'path': '/',
+        'raw_path': b'/',
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'idempotency-key', idempotency_key.encode())],
+        'client': ('127.0.0.1', 0),
+        'server': ('127.0.0.1', 80),
+    }
+
+    async def receive() -> Message:
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message: Message) -> None:
+        if message['type'] == 'http.response.start':
+            result.status_codes[message['status']] += 1
+            if app.replay_header_key.lower() in Headers(scope=message):
+                result.replays += 1
+
+    start = time.perf_counter()
+    try:
+        await app(scope, receive, send)
+    except InjectedBackendError as e:
+        result.exceptions[type(e).__name__] += 1
+        result.injected_failures[idempotency_key] += 1
+    except Exception as e:
+        result.exceptions[type(e).__name__] += 1
+    result.latencies.append(time.perf_counter() - start)
+
+
+async def run_load_test(
+    backend: Backend,
+    requests: int = 1000,
+    concurrency: int = 100,
+    duplicate_ratio: float = 0.5,
+    shuffle: bool = False,
+    handler_latency: float = 0.01,
+    backend_latency: float = 0.0,
+    backend_jitter: float = 0.0,
+    error_rate: float = 0.0,
+    seed: Optional[int] = None,
+) -> LoadTestResult:
+    """
+    Run a load test against the middleware using the given backend.
+    """
+    rng = random.Random(seed)
+    faulty_backend = FaultInjectingBackend(
+        backend, latency=backend_latency, jitter=backend_jitter, error_rate=error_rate, rng=rng
+    )
+    handler = CountingApp(handler_latency=handler_latency)
+    app = IdempotencyHeaderMiddleware(handler, backend=faulty_backend)
+    result = LoadTestResult(keys=build_keys(requests, duplicate_ratio, shuffle, rng), executions=handler.executions)
+
+    queue: 'asyncio.Queue[str]' = asyncio.Queue()
+    for key in result.keys:
+        queue.put_nowait(key)
+
+    async def worker() -> None:
+        while not queue.empty():
+            await _send_request(app, queue.get_nowait(), result)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    result.duration = time.perf_counter() - start
+    result.injected_errors = faulty_backend.injected_errors
+    return result
+
+
+def _make_backend(name: str, redis_url: Optional[str]) -> Backend:
+    if name == 'memory':
+        return MemoryBackend()
+
+    from idempotency_header_middleware.backends.redis import RedisBackend
+
+    if redis_url:
+        from redis.asyncio import from_url
+
+        return RedisBackend(redis=from_url(redis_url, decode_responses=True))
+
+    import fakeredis.aioredis
+
+    return RedisBackend(redis=fakeredis.aioredis.FakeRedis(decode_responses=True))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=['memory', 'redis'], default='memory')
+    parser.add_argument('--redis-url', help='Redis to run against. Defaults to an in-process fakeredis instance.')
+    parser.add_argument('--requests', type=int, default=1000, help='Total number of requests to send.')
+    parser.add_argument('--concurrency', type=int, default=100, help='Number of requests in flight at once.')
+    parser.add_argument('--duplicate-ratio', type=float, default=0.5, help='Share of requests reusing a key.')
+    parser.add_argument(
+        '--shuffle',
+        action='store_true',
+        help='Spread duplicates over the run instead of bursting, so retries after completion get replayed.',
+    )
+    parser.add_argument(
+        '--handler-latency',
+        type=float,
+        default=0.01,
+        help='Seconds spent in the handler. Duplicate requests only overlap while a handler is running.',
+    )
+    parser.add_argument('--backend-latency', type=float, default=0.0, help='Seconds added to each backend call.')
+    parser.add_argument('--backend-jitter', type=float, default=0.0, help='Random extra seconds per backend call.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability of a backend call failing.')
+    parser.add_argument('--seed', type=int, help='Seed for reproducible key distribution and fault injection.')
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(
+        run_load_test(
+            _make_backend(args.backend, args.redis_url),
+            requests=args.requests,
+            concurrency=args.concurrency,
+            duplicate_ratio=args.duplicate_ratio,
+            shuffle=args.shuffle,
+            handler_latency=args.handler_latency,
+            backend_latency=args.backend_latency,
+            backend_jitter=args.backend_jitter,
+            error_rate=args.error_rate,
+            seed=args.seed,
+        )
+    )
+    sys.stdout.write(result.report() + '\n')
+    return 0 if result.ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,36 @@
-from idempotency_header_middleware.backends.memory import MemoryBackend
-from idempotency_header_middleware.backends.redis import RedisBackend
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from idempotency_header_middleware.backends.memory import MemoryBackend
+    from idempotency_header_middleware.backends.redis import RedisBackend
+    from idempotency_header_middleware.backends.tiered import FileBlobStore, TieredBackend
 
 __all__ = (
     'RedisBackend',
     'MemoryBackend',
+    'TieredBackend',
+    'FileBlobStore',
 )
+
+# Backends are imported on first access, so that e.g., `redis` is
+# only imported by applications that actually use the redis backend
+_backend_modules = {
+    'RedisBackend': 'idempotency_header_middleware.backends.redis',
+    'MemoryBackend': 'idempotency_header_middleware.backends.memory',
+    'TieredBackend': 'idempotency_header_middleware.backends.tiered',
+    'FileBlobStore': 'idempotency_header_middleware.backends.tiered',
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _backend_modules:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+    value = getattr(import_module(_backend_modules[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *__all__})
@@ -2,8 +2,8 @@ import json
 from dataclasses import dataclass
 from typing import Optional, Tuple
 
-from fastapi.responses import JSONResponse
 from redis.asyncio import Redis
+from starlette.responses import JSONResponse
 
 from idempotency_header_middleware.backends.base import Backend
 
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, BinaryIO, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+
+from idempotency_header_middleware.backends.base import Backend
+
+logger = logging.getLogger(__name__)
+
+_BLOB_NAME = re.compile(r'[0-9a-f]{64}')
+
+# Blobs are written just before their pointer records, so keep them around a little
+# longer than the expiry to make sure they never expire before their pointers do
+BLOB_EXPIRY_GRACE_PERIOD = 60
+
+
+class BlobNotFoundError(LookupError):
+    """
+    Raised when the primary backend points to a response body the blob store doesn't have.
+    """
+
+
+class BlobStore(ABC):
+    chunk_size: int = 64 * 1024
+
+    @abstractmethod
+    async def store_blob(self, name: str, data: bytes) -> None:
+        """
+        Store a response body under the given name.
+        """
+        ...
+
+    @abstractmethod
+    async def open_blob(self, name: str) -> Optional[BinaryIO]:
+        """
+        Return an open binary file for a stored body if it exists, otherwise return None.
+
+        The caller is responsible for closing the file.
+        """
+        ...
+
+    @abstractmethod
+    def remove_expired(self, expiry: int) -> None:
+        """
+        Remove bodies stored more than `expiry` seconds ago.
+        """
+        ...
+
+
+@dataclass()
+class FileBlobStore(BlobStore):
+    """
+    Local filesystem blob store.
+
+    Each body is written to its own file in `directory`. Like the memory backend,
+    this is only shared between processes on the same host, so it should not be
+    combined with a primary backend that is shared between several hosts.
+    """
+
+    directory: str
+    chunk_size: int = 64 * 1024
+
+    def __post_init__(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        # Names are generated by the tiered backend, but never let one point outside the directory
+        if not _BLOB_NAME.fullmatch(name):
+            raise ValueError(f'Invalid blob name {name!r}, expected a hex-encoded sha256 digest')
+        return os.path.join(self.directory, name)
+
+    def _write(self, name: str, data: bytes) -> None:
+        path = self._path(name)
+        # Write to a temporary file first, so readers never see a partially written body
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _open(self, name: str) -> Optional[BinaryIO]:
+        try:
+            return open(self._path(name), 'rb')  # noqa: SIM115
+        except FileNotFoundError:
+            return None
+
+    async def store_blob(self, name: str, data: bytes) -> None:
+        """
+        Write a response body to a file.
+        """
+        await run_in_threadpool(self._write, name, data)
+
+    async def open_blob(self, name: str) -> Optional[BinaryIO]:
+        """
+        Open a stored response body.
+        """
+        return await run_in_threadpool(self._open, name)
+
+    def remove_expired(self, expiry: int) -> None:
+        """
+        Remove all files older than `expiry` seconds from the directory.
+        """
+        cutoff = time.time() - expiry
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and _BLOB_NAME.fullmatch(entry.name) and entry.stat().st_mtime <= cutoff:
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+
+
+@dataclass()
+class TieredBackend(Backend):
+    """
+    Backend which keeps large response bodies out of the primary backend.
+
+    Bodies up to `max_inline_size` bytes are stored in the primary backend as usual.
+    Larger bodies are written to the blob store, and the primary backend only stores a
+    small pointer record in their place. Replays of those responses are streamed from
+    the blob store in chunks, rather than loaded into memory.
+
+    Idempotency keys and small responses are stored in the primary backend exactly as
+    they would be without this backend, so an existing primary can be wrapped as is.
+    Responses expire with the primary backend's expiry. Expired bodies are not removed
+    from the blob store automatically; call `remove_expired_blobs` periodically to clean
+    them up.
+    """
+
+    primary: Backend
+    blob_store: BlobStore
+    max_inline_size: int = 64 * 1024
+
+    def __post_init__(self) -> None:
+        self.expiry = self.primary.expiry
+
+    # Pointer records are stored under their own key in the primary backend,
+    # so a response payload can never be mistaken for a pointer
+    @staticmethod
+    def _pointer_key(idempotency_key: str) -> str:
+        return 'blob:' + idempotency_key
+
+    @staticmethod
+    def _blob_name(idempotency_key: str) -> str:
+        # Idempotency keys are client input, so never use them in file names or object keys directly
+        return hashlib.sha256(idempotency_key.encode()).hexdigest()
+
+    async def _stream(self, f: BinaryIO) -> AsyncIterator[bytes]:
+        try:
+            while chunk := await run_in_threadpool(f.read, self.blob_store.chunk_size):
+                yield chunk
+        finally:
+            f.close()
+
+    async def get_stored_response(self, idempotency_key: str) -> Optional[Response]:
+        """
+        Return a stored response if it exists, otherwise return None.
+        """
+        if response := await self.primary.get_stored_response(idempotency_key):
+            return response
+
+        if not (pointer := await self.primary.get_stored_response(self._pointer_key(idempotency_key))):
+            return None
+
+        blob_name = self._blob_name(idempotency_key)
+        if not (f := await self.blob_store.open_blob(blob_name)):
+            message = f'Response body for idempotency key {idempotency_key!r} is missing from the blob store'
+            logger.error(message)
+            raise BlobNotFoundError(message)
+
+        return StreamingResponse(
+            self._stream(f),
+            status_code=pointer.status_code,
+            headers={'content-length': str(os.fstat(f.fileno()).st_size)},
+            media_type='application/json',
+        )
+
+    async def store_response_data(self, idempotency_key: str, payload: dict, status_code: int) -> None:
+        """
+        Store a response in the primary backend, or in the blob store if it's large.
+        """
+        # Measure the body the way the redis backend encodes it, since that's what would take up space
+        body = json.dumps(payload).encode()
+
+        if len(body) <= self.max_inline_size:
+            await self.primary.store_response_data(idempotency_key, payload, status_code)
+            return
+
+        blob_name = self._blob_name(idempotency_key)
+        await self.blob_store.store_blob(blob_name, body)
+        await self.primary.store_response_data(self._pointer_key(idempotency_key), {'blob': blob_name}, status_code)
+
+    async def store_idempotency_key(self, idempotency_key: str) -> bool:
+        """
+        Store an idempotency key header value in the primary backend.
+        """
+        return await self.primary.store_idempotency_key(idempotency_key)
+
+    async def clear_idempotency_key(self, idempotency_key: str) -> None:
+        """
+        Remove an idempotency header value from the primary backend.
+        """
+        await self.primary.clear_idempotency_key(idempotency_key)
+
+    def remove_expired_blobs(self) -> None:
+        """
+        Remove response bodies which have outlived the primary backend's expiry from the blob store.
+        """
+        if self.expiry:
+            self.blob_store.remove_expired(self.expiry + BLOB_EXPIRY_GRACE_PERIOD)
@@ -21,6 +21,7 @@ from starlette.responses import (
 )
 
 from idempotency_header_middleware.backends.redis import RedisBackend
+from idempotency_header_middleware.backends.tiered import FileBlobStore, TieredBackend
 from idempotency_header_middleware.middleware import IdempotencyHeaderMiddleware
 
 logger = logging.getLogger(__name__)
@@ -71,12 +72,24 @@ def method_config(request):
     return request.param
 
 
+@pytest.fixture(scope='session', params=['redis', 'tiered'])
+def middleware_backend(request, tmp_path_factory):
+    if request.param == 'redis':
+        return RedisBackend(redis=fakeredis.aioredis.FakeRedis(decode_responses=True))
+    # Spill every JSON response to the blob store, so replays are streamed
+    return TieredBackend(
+        RedisBackend(redis=fakeredis.aioredis.FakeRedis(decode_responses=True)),
+        FileBlobStore(str(tmp_path_factory.mktemp('blobs'))),
+        max_inline_size=1,
+    )
+
+
 @pytest.fixture(scope='session', autouse=True)
-def app_with_middleware(method_config):
+def app_with_middleware(method_config, middleware_backend):
     app.add_middleware(
         IdempotencyHeaderMiddleware,
         enforce_uuid4_formatting=True,
-        backend=RedisBackend(redis=fakeredis.aioredis.FakeRedis(decode_responses=True)),
+        backend=middleware_backend,
         applicable_methods=method_config['setting'],
     )
     yield app
@@ -1,4 +1,9 @@
 import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Tuple
 from uuid import uuid4
 
 import fakeredis.aioredis
@@ -7,6 +12,12 @@ import pytest
 from idempotency_header_middleware.backends.base import Backend
 from idempotency_header_middleware.backends.memory import MemoryBackend
 from idempotency_header_middleware.backends.redis import RedisBackend
+from idempotency_header_middleware.backends.tiered import (
+    BLOB_EXPIRY_GRACE_PERIOD,
+    BlobNotFoundError,
+    FileBlobStore,
+    TieredBackend,
+)
 from tests.conftest import dummy_response
 
 pytestmark = pytest.mark.asyncio
@@ -28,7 +39,14 @@ def test_base_backend():
 redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
 
 
-@pytest.mark.parametrize('backend', [RedisBackend(redis, expiry=1), MemoryBackend(expiry=1)])
+@pytest.mark.parametrize(
+    'backend',
+    [
+        RedisBackend(redis, expiry=1),
+        MemoryBackend(expiry=1),
+        TieredBackend(MemoryBackend(expiry=1), FileBlobStore(tempfile.mkdtemp())),
+    ],
+)
 async def test_backend(backend: Backend):
     assert issubclass(backend.__class__, Backend)
 
@@ -53,3 +71,129 @@ async def test_backend(backend: Backend):
     await backend.store_response_data(id_, dummy_response, 201)
     await asyncio.sleep(1)
     assert (await backend.get_stored_response(id_)) is None
+
+
+@pytest.fixture()
+def blob_store(tmp_path) -> FileBlobStore:
+    return FileBlobStore(str(tmp_path / 'blobs'), chunk_size=1024)
+
+
+async def read_response(response) -> Tuple[bytes, int]:
+    body = b''
+    chunks = 0
+    response_complete = asyncio.Event()
+
+    async def receive():
+        await response_complete.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal body, chunks
+        if message['type'] == 'http.response.body':
+            if message.get('body'):
+                body += message['body']
+                chunks += 1
+            if not message.get('more_body'):
+                response_complete.set()
+
+    await response({'type': 'http'}, receive, send)
+    return body, chunks
+
+
+def blob_name(idempotency_key: str) -> str:
+    return TieredBackend._blob_name(idempotency_key)
+
+
+@pytest.mark.parametrize('primary', [RedisBackend(redis, expiry=1), MemoryBackend(expiry=1)])
+async def test_tiered_backend_spills_large_responses(primary: Backend, blob_store: FileBlobStore):
+    backend = TieredBackend(primary, blob_store, max_inline_size=100)
+    assert backend.expiry == 1
+    small_id, large_id = str(uuid4()), str(uuid4())
+    large_response = {'items': ['x' * 100] * 50}
+
+    await backend.store_response_data(small_id, dummy_response, 201)
+    await backend.store_response_data(large_id, large_response, 201)
+    assert os.listdir(blob_store.directory) == [blob_name(large_id)]
+
+    # Small responses are stored inline
+    stored_response = await backend.get_stored_response(small_id)
+    assert stored_response.body == b'{"test":"test"}'
+
+    # Large responses are streamed from the blob store in chunks
+    stored_response = await backend.get_stored_response(large_id)
+    assert stored_response.status_code == 201
+    assert stored_response.headers['content-type'] == 'application/json'
+    body, chunks = await read_response(stored_response)
+    assert json.loads(body) == large_response
+    assert stored_response.headers['content-length'] == str(len(body))
+    assert chunks == 6
+
+    # Spilled responses expire with the pointer record, and are cleaned up after a grace period
+    await asyncio.sleep(1)
+    assert (await backend.get_stored_response(large_id)) is None
+    backend.remove_expired_blobs()
+    assert os.listdir(blob_store.directory) == [blob_name(large_id)]
+    expired = time.time() - 1 - BLOB_EXPIRY_GRACE_PERIOD
+    os.utime(os.path.join(blob_store.directory, blob_name(large_id)), (expired, expired))
+    backend.remove_expired_blobs()
+    assert os.listdir(blob_store.directory) == []
+
+
+async def test_tiered_backend_reads_existing_responses(blob_store: FileBlobStore):
+    primary = MemoryBackend()
+    id_ = str(uuid4())
+    await primary.store_response_data(id_, dummy_response, 201)
+
+    stored_response = await TieredBackend(primary, blob_store).get_stored_response(id_)
+    assert stored_response.body == b'{"test":"test"}'
+
+
+async def test_tiered_backend_measures_encoded_size(blob_store: FileBlobStore):
+    backend = TieredBackend(MemoryBackend(), blob_store, max_inline_size=40)
+    id_ = str(uuid4())
+
+    # 26 bytes as compact utf-8, but the redis backend stores the characters as ascii escapes
+    await backend.store_response_data(id_, {'v': 'æøåæøåæøå'}, 201)
+    assert os.listdir(blob_store.directory) == [blob_name(id_)]
+
+
+async def test_tiered_backend_never_reads_pointers_from_payloads(blob_store: FileBlobStore):
+    backend = TieredBackend(MemoryBackend(), blob_store)
+    id_ = str(uuid4())
+    payload = {'blob': '/etc/passwd', '__idempotency_blob__': '../' + blob_name(id_)}
+
+    await backend.store_response_data(id_, payload, 201)
+    stored_response = await backend.get_stored_response(id_)
+    assert json.loads(stored_response.body) == payload
+
+
+async def test_tiered_backend_missing_blob(blob_store: FileBlobStore):
+    backend = TieredBackend(MemoryBackend(), blob_store, max_inline_size=0)
+    id_ = str(uuid4())
+
+    await backend.store_response_data(id_, dummy_response, 201)
+    os.remove(os.path.join(blob_store.directory, blob_name(id_)))
+    with pytest.raises(BlobNotFoundError):
+        await backend.get_stored_response(id_)
+
+
+async def test_file_blob_store(blob_store: FileBlobStore):
+    a, b = blob_name('a'), blob_name('b')
+    await blob_store.store_blob(a, b'{}')
+    f = await blob_store.open_blob(a)
+    assert f.read() == b'{}'
+    f.close()
+    assert (await blob_store.open_blob(b)) is None
+
+    for name in ['/etc/passwd', '../' + a, a.upper(), a + 'a']:
+        with pytest.raises(ValueError, match='Invalid blob name'):
+            await blob_store.open_blob(name)
+        with pytest.raises(ValueError, match='Invalid blob name'):
+            await blob_store.store_blob(name, b'{}')
+
+    # Only files older than the expiry are removed
+    await blob_store.store_blob(b, b'{}')
+    expired = time.time() - 2
+    os.utime(os.path.join(blob_store.directory, a), (expired, expired))
+    blob_store.remove_expired(1)
+    assert os.listdir(blob_store.directory) == [b]
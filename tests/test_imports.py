@@ -0,0 +1,20 @@
+import pytest
+
+import idempotency_header_middleware.backends
+from benchmarks.import_time import TARGETS, benchmark
+from idempotency_header_middleware.backends.memory import MemoryBackend
+from idempotency_header_middleware.backends.redis import RedisBackend
+
+
+@pytest.mark.parametrize('target', TARGETS)
+def test_no_unexpected_imports(target: str):
+    assert benchmark(target, runs=1).unexpected_imports == set()
+
+
+def test_lazy_backend_attributes():
+    assert idempotency_header_middleware.backends.MemoryBackend is MemoryBackend
+    assert idempotency_header_middleware.backends.RedisBackend is RedisBackend
+    assert {'MemoryBackend', 'RedisBackend'} <= set(dir(idempotency_header_middleware.backends))
+
+    with pytest.raises(AttributeError, match="has no attribute 'PostgresBackend'"):
+        idempotency_header_middleware.backends.PostgresBackend
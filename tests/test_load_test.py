@@ -0,0 +1,72 @@
+import random
+
+import fakeredis.aioredis
+import pytest
+
+from benchmarks.load_test import build_keys, run_load_test
+from idempotency_header_middleware.backends.base import Backend
+from idempotency_header_middleware.backends.memory import MemoryBackend
+from idempotency_header_middleware.backends.redis import RedisBackend
+
+
+@pytest.fixture(params=['redis', 'memory'])
+def backend(request) -> Backend:
+    if request.param == 'redis':
+        return RedisBackend(fakeredis.aioredis.FakeRedis(decode_responses=True))
+    return MemoryBackend()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('shuffle', [False, True])
+async def test_duplicate_storm_executes_once(backend: Backend, shuffle: bool):
+    result = await run_load_test(
+        backend, requests=300, concurrency=50, duplicate_ratio=0.8, shuffle=shuffle, handler_latency=0.001, seed=1
+    )
+    assert result.ok
+    assert result.duplicate_executions == {}
+    assert result.missing_executions == []
+    assert sum(result.executions.values()) == result.unique_keys == 60
+    assert result.status_codes[201] + result.status_codes[409] == 300
+    assert len(result.latencies) == 300
+    if shuffle:
+        # Retries arriving after the first request has finished are replayed
+        assert result.replays > 0
+    else:
+        # Bursts of retries arrive while the first request is pending
+        assert result.status_codes[409] > 0
+
+
+@pytest.mark.asyncio
+async def test_backend_faults_never_cause_double_execution(backend: Backend):
+    result = await run_load_test(
+        backend, requests=300, concurrency=50, duplicate_ratio=0.5, backend_latency=0.001, error_rate=0.1, seed=1
+    )
+    assert result.injected_errors > 0
+    assert sum(result.exceptions.values()) == result.injected_errors
+    assert result.duplicate_executions == {}
+    assert result.missing_executions == []
+    assert result.ok
+
+
+class FailingBackend(MemoryBackend):
+    async def store_response_data(self, idempotency_key: str, payload: dict, status_code: int) -> None:
+        raise KeyError(idempotency_key)
+
+
+@pytest.mark.asyncio
+async def test_unexpected_exceptions_fail_the_run():
+    result = await run_load_test(FailingBackend(), requests=100, concurrency=10, duplicate_ratio=0, seed=1)
+    assert result.unexpected_exceptions == {'KeyError': 100}
+    assert not result.ok
+    assert result.report().endswith('FAILED')
+
+
+def test_build_keys():
+    keys = build_keys(100, 0.75, shuffle=False, rng=random.Random(0))
+    assert len(keys) == 100
+    assert len(set(keys)) == 25
+    # Duplicates are grouped, so each key appears in a single run
+    assert sum(1 for i, key in enumerate(keys) if i == 0 or keys[i - 1] != key) == 25
+
+    with pytest.raises(ValueError, match='duplicate_ratio'):
+        build_keys(100, 1, shuffle=False, rng=random.Random(0))
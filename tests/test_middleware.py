@@ -41,6 +41,7 @@ async def test_idempotence_works_for_json_responses(applicable_method: http_call
     response = await applicable_method(endpoint, headers=idempotency_header)
     assert response.json() == dummy_response
     assert dict(response.headers)['idempotent-replayed'] == 'true'
+    assert response.headers['content-length'] == str(len(response.content))
 
 
 other_response_endpoints = [